@@ -1,7 +1,7 @@
 """
 AWS CDK Stack
 
-Sets up S3 bucket, 2 DynamoDB tables, 2 Lambda functions,
+Sets up S3 bucket, 3 DynamoDB tables, 2 Lambda functions,
 API Gateway, ECR repo, ECS Fargate cluster, and daily ingestion schedule
 """
 
@@ -114,6 +114,19 @@ class EconSentinelStack(Stack):
             )
         )
 
+        # Metrics Registry Table (one item per distinct metric)
+        metrics_table = dynamodb.Table(
+            self,
+            "MetricsTable",
+            table_name="metrics",
+            partition_key=dynamodb.Attribute(
+                name="metric",
+                type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.RETAIN,
+        )
+
         # Lambda functions:
 
         # Analysis Lambda
@@ -129,6 +142,7 @@ class EconSentinelStack(Stack):
             environment={
                 "RISK_SCORES_TABLE_NAME": risk_scores_table.table_name,
                 "ALERT_RULES_TABLE_NAME": alert_rules_table.table_name,
+                "METRICS_TABLE_NAME": metrics_table.table_name,
                 "RAW_DATA_BUCKET_NAME": raw_data_bucket.bucket_name,
                 "SES_SENDER_EMAIL": os.environ.get("SES_SENDER_EMAIL", "alerts@econ-sentinel.com"),
             },
@@ -138,6 +152,7 @@ class EconSentinelStack(Stack):
         raw_data_bucket.grant_read(analysis_lambda)
         risk_scores_table.grant_read_write_data(analysis_lambda)
         alert_rules_table.grant_read_data(analysis_lambda)
+        metrics_table.grant_read_write_data(analysis_lambda)
 
         # Allow analysis lambda to send SES emails
         analysis_lambda.add_to_role_policy(
@@ -167,12 +182,15 @@ class EconSentinelStack(Stack):
             environment={
                 "RISK_SCORES_TABLE_NAME": risk_scores_table.table_name,
                 "ALERT_RULES_TABLE_NAME": alert_rules_table.table_name,
+                "METRICS_TABLE_NAME": metrics_table.table_name,
             },
             log_retention=logs.RetentionDays.ONE_WEEK,
         )
 
         risk_scores_table.grant_read_data(api_lambda)
         alert_rules_table.grant_read_write_data(api_lambda)
+        # Read/write so the API can backfill the registry from risk_scores
+        metrics_table.grant_read_write_data(api_lambda)
 
         # Cognito user pool
         user_pool = cognito.UserPool(
@@ -371,6 +389,13 @@ class EconSentinelStack(Stack):
             description="DynamoDB table for user alert rules"
         )
 
+        CfnOutput(
+            self,
+            "MetricsTableName",
+            value=metrics_table.table_name,
+            description="DynamoDB table listing every known metric"
+        )
+
         CfnOutput(
             self,
             "IngestionRepositoryUri",
@@ -6,6 +6,7 @@ Calculates risk scores and saves them to DynamoDB.
 """
 
 import json
+import logging
 import os
 import boto3
 from datetime import datetime
@@ -15,7 +16,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
 
 from shared.risk_calculator import RiskCalculator
 from shared.dynamodb_client import DynamoDBClient
-from shared.data_parser import DataParser
+from shared.data_parser import DataParser, ParsedRecord
 
 
 s3_client = boto3.client('s3')
@@ -24,6 +25,9 @@ dynamodb_client = DynamoDBClient()
 data_parser = DataParser()
 risk_calculator = RiskCalculator()
 
+# Shared modules log through the root logger; leave debug output off
+logging.getLogger().setLevel(logging.INFO)
+
 SENDER_EMAIL = os.environ.get('SES_SENDER_EMAIL', '')  # the 'from'
 
 
@@ -86,27 +90,51 @@ def lambda_handler(event: Dict[str, Any], context: Any):
             # Last resort
             else:
                 if 'metric' in parsed_data and 'value' in parsed_data:
-                    metrics_data.append({
-                        'metric': parsed_data['metric'],
-                        'value': float(parsed_data['value']),
-                        'timestamp': parsed_data.get('timestamp', parsed_data.get('date', '')),
-                        'source': parsed_data.get('source', 'unknown')
-                    })
+                    metrics_data.append(ParsedRecord(
+                        metric=parsed_data['metric'],
+                        value=float(parsed_data['value']),
+                        timestamp=parsed_data.get('timestamp', parsed_data.get('date', '')),
+                        source=parsed_data.get('source', 'unknown')
+                    ))
             
-            # Process each metric
+            # Score each metric
+            scored = []
             for metric_data in metrics_data:
                 try:
-                    process_metric(
-                        metric=metric_data['metric'],
-                        value=metric_data['value'],
-                        timestamp=metric_data.get('timestamp', ''),
+                    scored.append(score_metric(
+                        metric=metric_data.metric,
+                        value=metric_data.value,
+                        timestamp=metric_data.timestamp,
                         source_object_key=object_key
-                    )
-                    processed_count += 1
+                    ))
+                except Exception as e:
+                    error_msg = f"Error processing metric {metric_data.metric}: {str(e)}"
+                    print(error_msg)
+                    errors.append(error_msg)
+
+            # Save all scores from this object in one batch
+            if scored:
+                try:
+                    dynamodb_client.save_risk_scores(scored)
                 except Exception as e:
-                    error_msg = f"Error processing metric {metric_data.get('metric', 'unknown')}: {str(e)}"
+                    # Don't alert on scores that were not saved
+                    unsaved = ', '.join(score['metric'] for score in scored)
+                    error_msg = f"Error saving risk scores from {object_key} (metrics: {unsaved}): {str(e)}"
                     print(error_msg)
                     errors.append(error_msg)
+                    continue
+                processed_count += len(scored)
+
+            for score in scored:
+                print(f"Saved risk score for {score['metric']}: {score['severity']} (score: {score['risk_score']})")
+                # Check if alerts need to be triggered (if severity is warning or critical)
+                if score['severity'] in ['warning', 'critical']:
+                    try:
+                        trigger_alerts(score['metric'], score, score['value'])
+                    except Exception as e:
+                        error_msg = f"Error sending alerts for {score['metric']}: {str(e)}"
+                        print(error_msg)
+                        errors.append(error_msg)
         
         except Exception as e:
             error_msg = f"Error processing record: {str(e)}"
@@ -123,14 +151,16 @@ def lambda_handler(event: Dict[str, Any], context: Any):
     return result
 
 
-def process_metric(metric: str, value: float, timestamp: str, source_object_key: str):
+def score_metric(metric: str, value: float, timestamp: str, source_object_key: str):
     """
-    Process one metric: calculate the risk and save to DynamoDB.
+    Score one metric: calculate the risk against the moving average.
     Args:
         metric: Metric name
         value: Current value
         timestamp: Timestamp string
         source_object_key: S3 object key
+    Returns:
+        Dict of risk score fields, ready for DynamoDBClient.save_risk_scores
     """
     # Normalize the timestamp
     normalized_timestamp = data_parser.normalize_timestamp(timestamp)
@@ -147,23 +177,16 @@ def process_metric(metric: str, value: float, timestamp: str, source_object_key:
     
     risk_assessment = risk_calculator.calculate_risk(value, moving_avg)
     
-    # Save to DynamoDB
-    dynamodb_client.save_risk_score(
-        metric=metric,
-        timestamp=normalized_timestamp,
-        value=value,
-        moving_avg_30d=moving_avg,
-        pct_change=risk_assessment['pct_change'],
-        risk_score=risk_assessment['risk_score'],
-        severity=risk_assessment['severity'],
-        source_object_key=source_object_key
-    )
-    
-    print(f"Saved risk score for {metric}: {risk_assessment['severity']} (score: {risk_assessment['risk_score']})")
-    
-    # Check if alerts need to be triggered (if severity is warning or critical)
-    if risk_assessment['severity'] in ['warning', 'critical']:
-        trigger_alerts(metric, risk_assessment, value)
+    return {
+        'metric': metric,
+        'timestamp': normalized_timestamp,
+        'value': value,
+        'moving_avg_30d': moving_avg,
+        'pct_change': risk_assessment['pct_change'],
+        'risk_score': risk_assessment['risk_score'],
+        'severity': risk_assessment['severity'],
+        'source_object_key': source_object_key
+    }
 
 
 def trigger_alerts(metric: str, risk_assessment: Dict[str, Any], value: float):
@@ -2,13 +2,107 @@
 Shared utilities for parsing raw data from the ingestion layer.
 """
 
-import json
+import logging
+import re
+import sys
+from dataclasses import dataclass
 from typing import Dict, List, Optional, Any
 
+try:
+    import orjson as _json  # faster parser, works on bytes directly
+except ImportError:
+    import json as _json
+
+try:
+    # Drop-in float() with a faster string parser, same exceptions on bad input
+    from fastnumbers import float as _ffloat
+except ImportError:
+    _ffloat = float
+
+
+logger = logging.getLogger(__name__)
+
+# Date with optional time, separated by a space or 'T' (fields may be 1 digit)
+_ISO_DATE_RE = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T](\d{1,2}):(\d{1,2}):(\d{1,2}))?$')
+
+# Metric names per port name, so repeated ports share one interned string
+_METRIC_CACHE: Dict[str, str] = {}
+_METRIC_CACHE_MAX = 1024
+
+
+def _port_metric(port_name) -> str:
+    """Metric name for a port, e.g. 'port_congestion_LA'"""
+    if type(port_name) is not str:
+        return f"port_congestion_{port_name}"
+    metric = _METRIC_CACHE.get(port_name)
+    if metric is None:
+        metric = sys.intern(f"port_congestion_{port_name}")
+        if len(_METRIC_CACHE) < _METRIC_CACHE_MAX:
+            _METRIC_CACHE[port_name] = metric
+    return metric
+
+
+@dataclass(slots=True)
+class ParsedRecord:
+    """One parsed data point"""
+    metric: str
+    value: float
+    timestamp: str
+    source: str
+    port: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Dict form, as the parsers used to return (no 'port' key unless set)"""
+        result = {
+            'metric': self.metric,
+            'value': self.value,
+            'timestamp': self.timestamp,
+            'source': self.source
+        }
+        if self.port is not None:
+            result['port'] = self.port
+        return result
+
 
 class DataParser:
     """Parses the data from FRED API and port congestion sources."""
     
+    @staticmethod
+    def _parse_fred_series(data: Dict[str, Any]):
+        """FRED format with series data, uses the latest observation"""
+        series = data['data']
+        if not isinstance(series, list) or len(series) == 0:
+            return None
+        latest = series[-1]
+        return ParsedRecord(
+            metric=data.get('series_id', 'inflation_rate_cpi'),
+            value=_ffloat(latest.get('value', 0)),
+            timestamp=latest.get('date', ''),
+            source='fred'
+        )
+
+    @staticmethod
+    def _parse_fred_simple(data: Dict[str, Any]):
+        """FRED simplified format with metric and value at the top level"""
+        return ParsedRecord(
+            metric=data['metric'],
+            value=_ffloat(data['value']),
+            timestamp=data['date'] if 'date' in data else data.get('timestamp', ''),
+            source='fred'
+        )
+
+    # Top level keys that decide which FRED format a payload is in
+    _FRED_KEYS_OF_INTEREST = frozenset({'data', 'value', 'metric'})
+
+    # Shape signature -> handlers to try in order (first non-None result wins)
+    _FRED_HANDLERS = {
+        frozenset({'data'}): (_parse_fred_series,),
+        frozenset({'data', 'value'}): (_parse_fred_series,),
+        frozenset({'data', 'metric'}): (_parse_fred_series,),
+        frozenset({'value', 'metric'}): (_parse_fred_simple,),
+        frozenset({'data', 'value', 'metric'}): (_parse_fred_series, _parse_fred_simple),
+    }
+
     @staticmethod
     def parse_fred_data(data: Dict[str, Any]):
         """
@@ -16,33 +110,37 @@ class DataParser:
         Args:
             data: Raw FRED JSON
         Returns:
-            Parsed data dict with metric, value, timestamp, or None if invalid
+            ParsedRecord with metric, value, timestamp, or None if invalid
         """
+        if not isinstance(data, dict):
+            return None
         try:
-            # FRED format with series data
-            if 'data' in data and isinstance(data['data'], list) and len(data['data']) > 0:
-                latest = data['data'][-1]
-                return {
-                    'metric': data.get('series_id', 'inflation_rate_cpi'),
-                    'value': float(latest.get('value', 0)),
-                    'timestamp': latest.get('date', ''),
-                    'source': 'fred'
-                }
-            # FRED simplified format
-            if 'value' in data and 'metric' in data:
-                return {
-                    'metric': data['metric'],
-                    'value': float(data['value']),
-                    'timestamp': data.get('date', data.get('timestamp', '')),
-                    'source': 'fred'
-                }
-
+            sig = frozenset(data.keys()) & DataParser._FRED_KEYS_OF_INTEREST
+            for handler in DataParser._FRED_HANDLERS.get(sig, ()):
+                result = handler(data)
+                if result is not None:
+                    return result
             return None
 
         except (ValueError, KeyError, TypeError) as e:
-            print(f"Error parsing FRED data: {e}")
+            logger.warning("Error parsing FRED data: %s", e)
             return None
     
+    @staticmethod
+    def _parse_port_entry(port_data: Dict[str, Any]):
+        """Build the ParsedRecord for a single port entry"""
+        get = port_data.get
+        port_name = get('port', 'unknown')
+        raw_value = port_data['congestion_count'] if 'congestion_count' in port_data else get('value', 0)
+        timestamp = port_data['date'] if 'date' in port_data else get('timestamp', '')
+        return ParsedRecord(
+            metric=_port_metric(port_name),
+            value=_ffloat(raw_value),
+            timestamp=timestamp,
+            source='port_congestion',
+            port=port_name
+        )
+
     @staticmethod
     def parse_port_congestion_data(data: Dict[str, Any]):
         """
@@ -50,49 +148,34 @@ class DataParser:
         Args:
             data: Raw port congestion JSON
         Returns:
-            List of parsed data with metric, value, timestamp
+            List of ParsedRecord with metric, value, timestamp
         """
         results = []
         try:
             # Multiple ports format
             if 'ports' in data and isinstance(data['ports'], list):
+                parse_entry = DataParser._parse_port_entry
                 for port_data in data['ports']:
-                    port_name = port_data.get('port', 'unknown')
-                    metric = f"port_congestion_{port_name}"
-                    results.append({
-                        'metric': metric,
-                        'value': float(port_data.get('congestion_count', port_data.get('value', 0))),
-                        'timestamp': port_data.get('date', port_data.get('timestamp', '')),
-                        'source': 'port_congestion',
-                        'port': port_name
-                    })
+                    results.append(parse_entry(port_data))
             
             # Single port format
             elif 'port' in data or 'congestion_count' in data:
-                port_name = data.get('port', 'unknown')
-                metric = f"port_congestion_{port_name}"
-                results.append({
-                    'metric': metric,
-                    'value': float(data.get('congestion_count', data.get('value', 0))),
-                    'timestamp': data.get('date', data.get('timestamp', '')),
-                    'source': 'port_congestion',
-                    'port': port_name
-                })
+                results.append(DataParser._parse_port_entry(data))
             
             # Freight cost index format
             elif 'freight_cost_index' in data or 'freight_index' in data:
                 value = data.get('freight_cost_index') or data.get('freight_index')
-                results.append({
-                    'metric': 'freight_cost_index',
-                    'value': float(value),
-                    'timestamp': data.get('date', data.get('timestamp', '')),
-                    'source': 'freight'
-                })
+                results.append(ParsedRecord(
+                    metric='freight_cost_index',
+                    value=_ffloat(value),
+                    timestamp=data.get('date', data.get('timestamp', '')),
+                    source='freight'
+                ))
             
             return results
 
         except (ValueError, KeyError, TypeError) as e:
-            print(f"Error parsing port congestion data: {e}")
+            logger.warning("Error parsing port congestion data: %s", e)
             return []
     
     @staticmethod
@@ -107,13 +190,13 @@ class DataParser:
         """
         try:
             if content_type == 'application/json' or content_type.endswith('json'):
-                text = data.decode('utf-8')  # converts bytes into string
-                return json.loads(text)
+                # Both parsers accept the raw utf-8 bytes, no decode step needed
+                return _json.loads(data)
             else:
-                print("Unsupported content type")
+                logger.warning("Unsupported content type: %s", content_type)
                 return None
-        except (json.JSONDecodeError, UnicodeDecodeError) as e:
-            print(f"Error parsing S3 object: {e}")
+        except (_json.JSONDecodeError, UnicodeDecodeError) as e:
+            logger.warning("Error parsing S3 object: %s", e)
             return None
     
     @staticmethod
@@ -126,6 +209,10 @@ class DataParser:
             ISO 8601 timestamp string
         """
 
+        # Common case: already 'YYYY-MM-DDTHH:MM:SSZ', checked without scanning
+        if len(timestamp) == 20 and timestamp[-1] == 'Z' and timestamp[4] == '-' and timestamp[10] == 'T':
+            return timestamp
+
         # If already in ISO format
         if 'T' in timestamp and ('Z' in timestamp or '+' in timestamp or '-' in timestamp[-6:]):
             return timestamp
@@ -134,18 +221,11 @@ class DataParser:
         if len(timestamp) == 10 and timestamp.count('-') == 2:
             return f"{timestamp}T00:00:00Z"
         
-        # Try to reformat
-        try:
-            from datetime import datetime
-            # Try a couple common formats
-            for fmt in ['%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S']:
-                try:
-                    dt = datetime.strptime(timestamp, fmt)
-                    return dt.strftime('%Y-%m-%dT%H:%M:%S') + 'Z'
-                except ValueError:
-                    continue
-        except Exception:
-            pass
+        # Try to reformat 'YYYY-MM-DD HH:MM:SS' and 'YYYY-MM-DDTHH:MM:SS'
+        m = _ISO_DATE_RE.match(timestamp)
+        if m:
+            y, mo, d, h, mi, sec = m.groups()
+            return f"{y}-{mo.zfill(2)}-{d.zfill(2)}T{(h or '0').zfill(2)}:{(mi or '0').zfill(2)}:{(sec or '0').zfill(2)}Z"
         
         # Return unchanged if it couldn't be parsed
         return timestamp
@@ -1,26 +1,126 @@
 """
 DynamoDB utilities
+
+If you already have the recent scores for a metric (e.g. from
+get_scores_time_series for a chart), pass them to
+DynamoDBClient.calculate_moving_average_from instead of calling
+calculate_moving_average, which runs its own query.
 """
 
+import logging
 import os
+import time
 import boto3 # for talking to AWS
-from typing import List, Dict, Optional
+from collections import OrderedDict
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 from boto3.dynamodb.conditions import Key
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# How long get_all_metrics results are reused before asking DynamoDB again
+METRICS_CACHE_TTL_SECONDS = 60
+
+# How long a computed moving average is reused, and how many are kept
+MOVING_AVG_CACHE_TTL_SECONDS = 300
+MOVING_AVG_CACHE_SIZE = 128
+
+# Registry item written once the registry has been backfilled from risk_scores
+_REGISTRY_BACKFILL_MARKER = '__registry_backfilled__'
+
+# (expires_at, metrics) shared by all clients in a warm Lambda container
+_metrics_cache = (0.0, [])
+
+# Time series queries spanning more than this many days are split into
+# TIME_SERIES_MAX_WORKERS equal sub-ranges that are queried in parallel
+TIME_SERIES_SPLIT_DAYS = 90
+TIME_SERIES_MAX_WORKERS = 4
+QUERY_PAGE_SIZE = 500
+
+_ISO_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+# Connection pooling and keep-alive so warm containers reuse connections
+_BOTO_CONFIG = Config(
+    max_pool_connections=50,
+    tcp_keepalive=True,
+    retries={'mode': 'adaptive', 'max_attempts': 3}
+)
+
+
+@lru_cache(maxsize=None)
+def _dynamodb_resource():
+    """DynamoDB resource shared by every client in the process"""
+    return boto3.session.Session().resource('dynamodb', config=_BOTO_CONFIG)
+
+
+@lru_cache(maxsize=None)
+def _dynamodb_low_level_client():
+    """
+    Client behind the shared resource. Unlike the resource it is safe to use
+    across threads, and it still converts conditions and items for us.
+    """
+    return _dynamodb_resource().meta.client
+
+
+@lru_cache(maxsize=None)
+def _table(name: str):
+    """Shared Table handle for a table name"""
+    return _dynamodb_resource().Table(name)
 
 
 class DynamoDBClient:
     """For interacting with DynamoDB tables"""
     
     def __init__(self):
-        self.dynamodb = boto3.resource('dynamodb')
+        self.dynamodb = _dynamodb_resource()
         self.risk_scores_table_name = os.environ.get('RISK_SCORES_TABLE_NAME', 'risk_scores')
         self.alert_rules_table_name = os.environ.get('ALERT_RULES_TABLE_NAME', 'user_alert_rules')
+        self.metrics_table_name = os.environ.get('METRICS_TABLE_NAME', 'metrics')
         
-        self.risk_scores_table = self.dynamodb.Table(self.risk_scores_table_name)
-        self.alert_rules_table = self.dynamodb.Table(self.alert_rules_table_name)
+        self.risk_scores_table = _table(self.risk_scores_table_name)
+        self.alert_rules_table = _table(self.alert_rules_table_name)
+        self.metrics_table = _table(self.metrics_table_name)
+
+        # Metrics already known to be in the metrics registry
+        self._registered_metrics = set()
+
+        # (metric, days) -> (moving average, expires_at), least recently used first
+        self._ma_cache: "OrderedDict[Tuple[str, int], Tuple[Optional[float], float]]" = OrderedDict()
     
+    @staticmethod
+    def _build_item(
+        metric: str,
+        timestamp: str,
+        value: float,
+        moving_avg_30d: float,
+        pct_change: float,
+        risk_score: int,
+        severity: str,
+        source_object_key: str
+    ):
+        """Build the DynamoDB item for a risk score"""
+        return {
+            'metric': metric,
+            'timestamp': timestamp,
+            'value': Decimal(str(value)),
+            'moving_avg_30d': Decimal(str(moving_avg_30d)),
+            'pct_change': Decimal(str(pct_change)),
+            'risk_score': risk_score,
+            'severity': severity,
+            'source_object_key': source_object_key
+        }
+
     def save_risk_score(
         self,
         metric: str,
@@ -44,17 +144,52 @@ class DynamoDBClient:
             severity: Severity level
             source_object_key: key of the S3 object that was scored
         """
-        item = {
+        self.save_risk_scores([{
             'metric': metric,
             'timestamp': timestamp,
-            'value': Decimal(str(value)),
-            'moving_avg_30d': Decimal(str(moving_avg_30d)),
-            'pct_change': Decimal(str(pct_change)),
+            'value': value,
+            'moving_avg_30d': moving_avg_30d,
+            'pct_change': pct_change,
             'risk_score': risk_score,
             'severity': severity,
             'source_object_key': source_object_key
-        }
-        self.risk_scores_table.put_item(Item=item)
+        }])
+
+    def save_risk_scores(self, items: List[Dict]):
+        """
+        Save many risk scores at once, batching up to 25 writes per request
+        Args:
+            items: List of dicts with the same fields as save_risk_score
+        """
+        with self.risk_scores_table.batch_writer(overwrite_by_pkeys=['metric', 'timestamp']) as batch:
+            for item in items:
+                batch.put_item(Item=self._build_item(**item))
+
+        for metric in {item['metric'] for item in items}:
+            self._invalidate_moving_average(metric)
+            self._register_metric(metric)
+
+    def _register_metric(self, metric: str):
+        """
+        Add a metric to the metrics registry if it is not there yet.
+        Best effort: the registry only feeds the metrics list, so a failed
+        write is logged and retried on the next save instead of raised.
+        Args:
+            metric: Metric name
+        """
+        if metric in self._registered_metrics:
+            return
+        try:
+            self.metrics_table.put_item(
+                Item={'metric': metric},
+                ConditionExpression='attribute_not_exists(metric)'
+            )
+        except ClientError as e:
+            # Already registered
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                logger.warning("Could not register metric %s: %s", metric, e)
+                return
+        self._registered_metrics.add(metric)
     
     def get_latest_score(self, metric: str):
         """
@@ -94,16 +229,90 @@ class DynamoDBClient:
         if len(end_date) == 10:  # If in YYYY-MM-DD format
             end_date = f"{end_date}T23:59:59Z"
         
-        response = self.risk_scores_table.query(
-            KeyConditionExpression=Key('metric').eq(metric) & 
-                                  Key('timestamp').between(start_date, end_date),
+        subranges = self._split_range(start_date, end_date)
+        if len(subranges) == 1:
+            items = self._query_range(metric, start_date, end_date, limit)
+        else:
+            items = self._query_subranges(metric, subranges, limit)
+
+        return [self._convert_decimal_to_float(item) for item in items]
+
+    def _query_subranges(self, metric: str, subranges: List[Tuple[str, str]], limit: int):
+        """
+        Query subranges (newest first) in parallel and merge them in order,
+        stopping the older ones once `limit` items have been collected
+        """
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=TIME_SERIES_MAX_WORKERS)
+        try:
+            futures = [executor.submit(self._query_range, metric, s, e, limit, stop) for s, e in subranges]
+            items = []
+            seen = set()
+            for future in futures:
+                for item in future.result():
+                    # Neighbouring subranges share a boundary timestamp
+                    if item['timestamp'] not in seen:
+                        seen.add(item['timestamp'])
+                        items.append(item)
+                if len(items) >= limit:
+                    stop.set()
+                    break
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        return items[:limit]
+
+    def _query_range(self, metric: str, start_date: str, end_date: str, limit: int,
+                     stop: Optional[threading.Event] = None):
+        """
+        Query risk scores for one time range, newest first
+        Args:
+            metric: metric name
+            start_date: Start timestamp (ISO)
+            end_date: End timestamp (ISO)
+            limit: Max amount of items to return
+            stop: Optional event; no further pages are fetched once it is set
+        Returns:
+            List of raw risk score items
+        """
+        paginator = _dynamodb_low_level_client().get_paginator('query')
+        pages = paginator.paginate(
+            TableName=self.risk_scores_table_name,
+            KeyConditionExpression=Key('metric').eq(metric) &
+                                   Key('timestamp').between(start_date, end_date),
             ScanIndexForward=False,  # descending for newest first
-            Limit=limit
+            PaginationConfig={'PageSize': min(QUERY_PAGE_SIZE, limit), 'MaxItems': limit}
         )
-        
-        # Get only the 'Items' part of the dict
-        items = response.get('Items', [])
-        return [self._convert_decimal_to_float(item) for item in items]
+        items = []
+        for page in pages:
+            items.extend(page.get('Items', []))
+            if stop is not None and stop.is_set():
+                break
+        return items
+
+    @staticmethod
+    def _split_range(start_date: str, end_date: str):
+        """
+        Split a long time range into at most TIME_SERIES_MAX_WORKERS equal
+        subranges, newest first. Ranges that are short or not in plain ISO
+        format are kept whole.
+        """
+        try:
+            start = datetime.strptime(start_date, _ISO_FORMAT)
+            end = datetime.strptime(end_date, _ISO_FORMAT)
+        except ValueError:
+            return [(start_date, end_date)]
+        if (end - start).days <= TIME_SERIES_SPLIT_DAYS:
+            return [(start_date, end_date)]
+
+        step = (end - start) / TIME_SERIES_MAX_WORKERS
+        subranges = []
+        upper = end_date
+        for i in range(TIME_SERIES_MAX_WORKERS - 1, 0, -1):
+            lower = (start + step * i).strftime(_ISO_FORMAT)
+            subranges.append((lower, upper))
+            upper = lower
+        subranges.append((start_date, upper))
+        return subranges
 
     def get_recent_scores_for_average(self, metric: str, days: int = 30):
         """
@@ -118,34 +327,104 @@ class DynamoDBClient:
         start_date = end_date - timedelta(days=days)
         start_iso = start_date.strftime('%Y-%m-%dT00:00:00Z')
         end_iso = end_date.strftime('%Y-%m-%dT23:59:59Z')
-        return self.get_scores_time_series(metric, start_iso, end_iso, limit=1000)
+        # The window is short, so one query is cheaper than splitting it
+        items = self._query_range(metric, start_iso, end_iso, limit=1000)
+        return [self._convert_decimal_to_float(item) for item in items]
 
     def calculate_moving_average(self, metric: str, days: int = 30):
         """
-        Calculate moving average from recent scores
+        Calculate moving average from recent scores.
+        Results are cached for a few minutes and dropped when the metric is saved.
         Args:
             metric: Metric name
             days: Number of days for moving average
         Returns:
             Moving average value or None if not enough data
         """
-        recent_scores = self.get_recent_scores_for_average(metric, days)
+        key = (metric, days)
+        now = time.monotonic()
+        hit = self._ma_cache.get(key)
+        if hit and hit[1] > now:
+            self._ma_cache.move_to_end(key)
+            return hit[0]
+
+        moving_avg = self.calculate_moving_average_from(
+            self.get_recent_scores_for_average(metric, days)
+        )
 
+        self._ma_cache[key] = (moving_avg, now + MOVING_AVG_CACHE_TTL_SECONDS)
+        self._ma_cache.move_to_end(key)
+        if len(self._ma_cache) > MOVING_AVG_CACHE_SIZE:
+            self._ma_cache.popitem(last=False)
+        return moving_avg
+
+    @staticmethod
+    def calculate_moving_average_from(recent_scores: List[Dict]):
+        """
+        Calculate moving average from risk score items that were already fetched
+        Args:
+            recent_scores: Items as returned by get_scores_time_series
+        Returns:
+            Moving average value or None if there are no items
+        """
         if not recent_scores:
             return None
-
+        if np is not None:
+            # Values are already floats after _convert_decimal_to_float
+            return float(np.fromiter(
+                (score['value'] for score in recent_scores),
+                dtype=np.float64,
+                count=len(recent_scores)
+            ).mean())
         values = [float(score['value']) for score in recent_scores]
-        if values:
-            return sum(values) / len(values)
-        return None
+        return sum(values) / len(values)
+
+    def _invalidate_moving_average(self, metric: str):
+        """Drop cached moving averages for a metric"""
+        for key in [key for key in self._ma_cache if key[0] == metric]:
+            del self._ma_cache[key]
 
     def get_all_metrics(self):
         """
-        Get list of all unique metrics in the DynamoDB
+        Get list of all unique metrics, read from the metrics registry
+        Returns:
+            List of metric names
+        """
+        global _metrics_cache
+        expires_at, metrics = _metrics_cache
+        now = time.monotonic()
+        if now < expires_at:
+            return list(metrics)
+
+        metrics = self._scan_metrics(self.metrics_table)
+        if _REGISTRY_BACKFILL_MARKER in metrics:
+            metrics.remove(_REGISTRY_BACKFILL_MARKER)
+        else:
+            # Metrics saved before the registry existed are only in risk_scores
+            metrics = self._backfill_metrics_registry()
+
+        _metrics_cache = (now + METRICS_CACHE_TTL_SECONDS, metrics)
+        return list(metrics)
+
+    def _backfill_metrics_registry(self):
+        """
+        Register every metric found in the risk scores table, then write the
+        marker so this full scan only happens once
         Returns:
             List of metric names
         """
-        response = self.risk_scores_table.scan(
+        metrics = self._scan_metrics(self.risk_scores_table)
+        with self.metrics_table.batch_writer() as batch:
+            for metric in metrics:
+                batch.put_item(Item={'metric': metric})
+        self.metrics_table.put_item(Item={'metric': _REGISTRY_BACKFILL_MARKER})
+        self._registered_metrics.update(metrics)
+        return metrics
+
+    @staticmethod
+    def _scan_metrics(table):
+        """Scan a table for the unique values of its 'metric' attribute"""
+        response = table.scan(
             ProjectionExpression='metric'
         )
         metrics = set()
@@ -153,7 +432,7 @@ class DynamoDBClient:
             metrics.add(item['metric'])
         # Get the rest
         while 'LastEvaluatedKey' in response:
-            response = self.risk_scores_table.scan(
+            response = table.scan(
                 ProjectionExpression='metric',
                 ExclusiveStartKey=response['LastEvaluatedKey']
             )
@@ -227,38 +506,35 @@ class DynamoDBClient:
         Returns:
             List of alert rule items
         """
-        response = self.alert_rules_table.query(
+        paginator = _dynamodb_low_level_client().get_paginator('query')
+        pages = paginator.paginate(
+            TableName=self.alert_rules_table_name,
             IndexName='metric-index',
             KeyConditionExpression=Key('metric').eq(metric)
         )
-        items = response.get('Items', [])
-        while 'LastEvaluatedKey' in response:
-            response = self.alert_rules_table.query(
-                IndexName='metric-index',
-                KeyConditionExpression=Key('metric').eq(metric),
-                ExclusiveStartKey=response['LastEvaluatedKey']
-            )
-            items.extend(response.get('Items', []))
-        return [self._convert_decimal_to_float(item) for item in items]
+        return [
+            self._convert_decimal_to_float(item)
+            for page in pages
+            for item in page.get('Items', [])
+        ]
 
     @staticmethod
     def _convert_decimal_to_float(item: Dict):
-        """Convert Decimal types to float for JSON"""
-        converted = {}
-        for key, value in item.items():
-            if isinstance(value, Decimal):
-                converted[key] = float(value)
-            elif isinstance(value, dict):
-                converted[key] = DynamoDBClient._convert_decimal_to_float(value)
-            elif isinstance(value, list):
-                converted[key] = []
-                for v in value:
-                    if isinstance(v, dict):
-                        converted[key].append(DynamoDBClient._convert_decimal_to_float(v))
-                    elif isinstance(v, Decimal):
-                        converted[key].append(float(v))
-                    else:
-                        converted[key].append(v)
+        """
+        Convert Decimal types to float for JSON.
+        Items come fresh from boto3, so they are converted in place.
+        """
+        stack = [item]
+        while stack:
+            current = stack.pop()
+            if type(current) is dict:
+                entries = current.items()
             else:
-                converted[key] = value
-        return converted
+                entries = enumerate(current)
+            for key, value in entries:
+                value_type = type(value)
+                if value_type is Decimal:
+                    current[key] = float(value)
+                elif value_type is dict or value_type is list:
+                    stack.append(value)
+        return item
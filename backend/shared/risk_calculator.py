@@ -35,6 +35,35 @@ class RiskCalculator:
             return 0.0
         return ((current_value - moving_avg) / moving_avg) * 100.0
     
+    # Severities in threshold order, indexed by how many thresholds are crossed
+    _SEVERITIES = (Severity.NORMAL, Severity.WARNING, Severity.CRITICAL)
+    _SEVERITY_VALUES = tuple(severity.value for severity in _SEVERITIES)
+
+    @staticmethod
+    def _severity_index(abs_change: float) -> int:
+        """
+        0 normal, 1 warning, 2 critical. Written with '<' like the thresholds
+        are defined, so a NaN change counts as critical.
+        """
+        return 2 - (abs_change < RiskCalculator.NORMAL_THRESHOLD) - (abs_change < RiskCalculator.WARNING_THRESHOLD)
+
+    @staticmethod
+    def _score_and_index(abs_change: float):
+        """
+        Risk score and severity index for an absolute percent change.
+        Only the formula for the matching range is evaluated (normal 0-30,
+        warning 31-70, critical 71-100; anything over 50% change is max risk).
+        """
+        n, w = RiskCalculator.NORMAL_THRESHOLD, RiskCalculator.WARNING_THRESHOLD
+        idx = RiskCalculator._severity_index(abs_change)
+        if idx == 0:
+            score = min(30, int(abs_change * 6))
+        elif idx == 1:
+            score = 31 + int(((abs_change - n) / (w - n)) * 39)
+        else:
+            score = 71 + min(29, int(((abs_change - w) / 35.0) * 29))
+        return score, idx
+
     @staticmethod
     def calculate_risk_score(pct_change: float) -> int:
         """
@@ -44,24 +73,7 @@ class RiskCalculator:
         Returns:
             risk score out of 100
         """
-        abs_change = abs(pct_change)
-        
-        if abs_change < RiskCalculator.NORMAL_THRESHOLD:
-            # Normal: 0-30 risk score range
-            return min(30, int(abs_change * 6))
-        elif abs_change < RiskCalculator.WARNING_THRESHOLD:
-            # Warning: 31-70 risk score range
-            base_score = 31
-            range_size = abs_change - RiskCalculator.NORMAL_THRESHOLD
-            max_range = RiskCalculator.WARNING_THRESHOLD - RiskCalculator.NORMAL_THRESHOLD
-            return base_score + int((range_size / max_range) * 39)
-        else:
-            # Critical: 71-100 risk score range
-            base_score = 71
-            range_size = abs_change - RiskCalculator.WARNING_THRESHOLD
-            # Cap at 100, assume anything > 50% change is max risk
-            additional_score = min(29, int((range_size / 35.0) * 29))
-            return base_score + additional_score
+        return RiskCalculator._score_and_index(abs(pct_change))[0]
     
     @staticmethod
     def determine_severity(pct_change: float) -> Severity:
@@ -72,14 +84,7 @@ class RiskCalculator:
         Returns:
             Severity
         """
-        abs_change = abs(pct_change)
-        
-        if abs_change < RiskCalculator.NORMAL_THRESHOLD:
-            return Severity.NORMAL
-        elif abs_change < RiskCalculator.WARNING_THRESHOLD:
-            return Severity.WARNING
-        else:
-            return Severity.CRITICAL
+        return RiskCalculator._SEVERITIES[RiskCalculator._severity_index(abs(pct_change))]
     
     @staticmethod
     def calculate_risk(current_value: float, moving_avg: float) -> Dict[str, any]:
@@ -91,11 +96,33 @@ class RiskCalculator:
         Returns:
             Dict of pct_change, risk_score, severity
         """
-        pct_change = RiskCalculator.calculate_percent_change(current_value, moving_avg)
-        risk_score = RiskCalculator.calculate_risk_score(pct_change)
-        severity = RiskCalculator.determine_severity(pct_change)
+        pct_change = 0.0 if moving_avg == 0 else (current_value - moving_avg) / moving_avg * 100.0
+        risk_score, idx = RiskCalculator._score_and_index(abs(pct_change))
         return {
             "pct_change": round(pct_change, 2),
             "risk_score": risk_score,
-            "severity": severity.value
+            "severity": RiskCalculator._SEVERITY_VALUES[idx]
         }
+
+    @staticmethod
+    def calculate_risk_bulk(values, moving_avgs):
+        """
+        Score many data points at once with the compiled kernel (for backfills).
+        Args:
+            values: Sequence or array of current values
+            moving_avgs: Sequence or array of moving averages, same length
+        Returns:
+            Tuple of numpy arrays (pct_change, risk_score, severity index);
+            pct_change is not rounded and the severity index maps onto
+            Severity in order (0 normal, 1 warning, 2 critical)
+        """
+        import numpy as np
+        from shared.risk_kernels import risk_bulk
+
+        vals = np.ascontiguousarray(values, dtype=np.float64)
+        mas = np.ascontiguousarray(moving_avgs, dtype=np.float64)
+        if vals.shape != mas.shape or vals.ndim != 1:
+            raise ValueError("values and moving_avgs must be 1-D arrays of the same length")
+        if not (np.isfinite(vals).all() and np.isfinite(mas).all()):
+            raise ValueError("values and moving_avgs must be finite")
+        return risk_bulk(vals, mas)
@@ -0,0 +1,51 @@
+"""
+Numba compiled kernels for scoring many data points at once (backfills).
+Uses the same formulas as RiskCalculator.
+"""
+
+import os
+
+import numpy as np
+
+# Compiled artifacts need a writable cache dir on Lambda
+os.environ.setdefault('NUMBA_CACHE_DIR', '/tmp/numba_cache')
+from numba import njit, prange
+
+NORMAL_THRESHOLD = 5.0
+WARNING_THRESHOLD = 15.0
+
+
+@njit(cache=True, parallel=True)
+def risk_bulk(vals, mas):
+    """
+    Score arrays of values against their moving averages.
+    Args:
+        vals: float64 array of current values
+        mas: float64 array of moving averages, same length as vals
+    Returns:
+        (pct_change, risk_score, severity index) arrays, where the severity
+        index is 0 normal, 1 warning, 2 critical
+    """
+    n = vals.shape[0]
+    pc = np.empty(n, dtype=np.float64)
+    sc = np.empty(n, dtype=np.int32)
+    sv = np.empty(n, dtype=np.int8)
+    span = WARNING_THRESHOLD - NORMAL_THRESHOLD
+    for i in prange(n):
+        ma = mas[i]
+        pcv = 0.0 if ma == 0 else (vals[i] - ma) / ma * 100.0
+        a = abs(pcv)
+        idx = np.int8(a >= NORMAL_THRESHOLD) + np.int8(a >= WARNING_THRESHOLD)
+        # Clamp as floats before truncating so huge changes can't overflow
+        normal = int(min(30.0, a * 6))
+        warning = 31 + int(min(a - NORMAL_THRESHOLD, span) / span * 39)
+        critical = 71 + int(min(29.0, (a - WARNING_THRESHOLD) / 35.0 * 29))
+        if idx == 0:
+            sc[i] = normal
+        elif idx == 1:
+            sc[i] = warning
+        else:
+            sc[i] = critical
+        pc[i] = pcv
+        sv[i] = idx
+    return pc, sc, sv